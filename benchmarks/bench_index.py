@@ -0,0 +1,88 @@
+# coding: utf-8
+
+"""
+Compares ConnectionStringIndex queries with a linear scan over all the connection strings::
+
+    python benchmarks/bench_index.py --entries 1000000
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import argparse
+import random
+import time
+
+from pyconstring import ConnectionString, ConnectionStringIndex
+
+
+PROVIDERS = ['SQLOLEDB', 'MSDASQL', 'MSOLEDBSQL', 'OraOLEDB.Oracle', 'Microsoft.ACE.OLEDB.12.0']
+
+
+def make_entries(count, servers, seed=0):
+    rand = random.Random(seed)
+
+    for i in range(count):
+        items = [
+            ('Provider', rand.choice(PROVIDERS)),
+            ('Server', 'db%d' % rand.randrange(servers)),
+            ('Database', 'app%d' % i),
+            ('User Id', 'user%d' % rand.randrange(100)),
+        ]
+        if rand.random() < 0.1:
+            items.append(('Timeout', '30'))
+
+        yield 'dsn%d' % i, ConnectionString(items)
+
+
+def linear_scan(entries, equals, keys):
+    return {
+        name for name, cs in entries
+        if all(key in cs and cs[key] == value for key, value in equals.items())
+        and all(key in cs for key in keys)
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--servers', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    entries, elapsed = timed(list, make_entries(args.entries, args.servers))
+    print('Built %d connection strings in %.2fs' % (len(entries), elapsed))
+
+    index = ConnectionStringIndex()
+    _, elapsed = timed(lambda: [index.add(name, cs) for name, cs in entries])
+    print('Indexed them in %.2fs' % elapsed)
+
+    queries = [
+        ({'provider': 'SQLOLEDB'}, []),
+        ({'provider': 'SQLOLEDB', 'server': 'db7'}, []),
+        ({'server': 'db7'}, ['timeout']),
+        ({}, ['timeout']),
+    ]
+
+    for equals, keys in queries:
+        expected, scan_time = timed(lambda: [linear_scan(entries, equals, keys) for _ in range(args.repeat)])
+        found, index_time = timed(lambda: [index.query(equals, keys) for _ in range(args.repeat)])
+        assert found[0] == expected[0]
+
+        print('%-45s %8d matches   scan %8.2fms   index %8.2fms   x%.0f' % (
+            'equals=%s keys=%s' % (sorted(equals.items()), keys),
+            len(found[0]),
+            scan_time / args.repeat * 1000,
+            index_time / args.repeat * 1000,
+            scan_time / max(index_time, 1e-9),
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,21 @@
 # coding utf-8
 from .pyconstring import (
+    CollectionDiff,
     ConnectionString,
+    FrozenConnectionString,
+    Patch,
+    SerializeStats,
     __version__,
+    diff,
+    diff_many,
+    serialize_many,
 )
+from .loader import (
+    ConnectionStringFile,
+    ReloadDiff,
+)
+from .registry import (
+    ConnectionStringRegistry,
+    RegistryStats,
+)
+from .index import ConnectionStringIndex
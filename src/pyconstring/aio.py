@@ -0,0 +1,203 @@
+# coding: utf-8
+
+"""
+Asyncio loading of named connection strings from many sources at once. Requires Python 3.5+::
+
+    result = await load([
+        FileSource('/etc/app/constrings.conf'),
+        EnvironSource(prefix='CONSTRING_'),
+        SecretsDirSource('/run/secrets'),
+    ])
+
+"""
+
+import asyncio
+import io
+import os
+import time
+
+from collections import namedtuple
+
+from .loader import iter_entries
+from .pyconstring import ConnectionString
+
+
+__all__ = [
+    'EnvironSource',
+    'FileSource',
+    'LoadResult',
+    'SecretsDirSource',
+    'Source',
+    'SourceReport',
+    'load',
+]
+
+
+LoadResult = namedtuple('LoadResult', 'entries reports')
+SourceReport = namedtuple('SourceReport', 'source count fetch_time parse_time errors')
+
+
+class Source(object):
+    """
+    Origin of named connection strings. Subclasses must implement :meth:`fetch`.
+
+    """
+
+    async def fetch(self):
+        """
+        :returns: list of tuples (name, raw connection string)
+
+        """
+        raise NotImplementedError
+
+
+class FileSource(Source):
+    """
+    Connection string file, in the format described in :func:`pyconstring.loader.iter_entries`
+
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+
+    def _read(self):
+        with io.open(self.path, encoding=self.encoding) as f:
+            return list(iter_entries(f))
+
+    async def fetch(self):
+        return await asyncio.get_event_loop().run_in_executor(None, self._read)
+
+    def __repr__(self):
+        return '<FileSource \'%s\'>' % self.path
+
+
+class EnvironSource(Source):
+    """
+    Environment variables whose name starts with `prefix`. The prefix is removed from the entry names.
+
+    :param dict environ: variables to be used instead of ``os.environ``
+
+    """
+
+    def __init__(self, prefix, environ=None):
+        self.prefix = prefix
+        self.environ = os.environ if environ is None else environ
+
+    async def fetch(self):
+        return [
+            (name[len(self.prefix):], value)
+            for name, value in self.environ.items()
+            if name.startswith(self.prefix) and len(name) > len(self.prefix)
+        ]
+
+    def __repr__(self):
+        return '<EnvironSource \'%s\'>' % self.prefix
+
+
+class SecretsDirSource(Source):
+    """
+    Directory with one file per entry, named as the entry, like the secrets mounted in containers.
+    Hidden files are ignored.
+
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+
+    def _read(self):
+        entries = []
+
+        for name in sorted(os.listdir(self.path)):
+            path = os.path.join(self.path, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+
+            with io.open(path, encoding=self.encoding) as f:
+                entries.append((name, f.read().strip()))
+
+        return entries
+
+    async def fetch(self):
+        return await asyncio.get_event_loop().run_in_executor(None, self._read)
+
+    def __repr__(self):
+        return '<SecretsDirSource \'%s\'>' % self.path
+
+
+def _parse_entries(cs_class, entries):
+    """
+    Parses a list of tuples (name, raw connection string). Kept at module level,
+    so that it can be sent to process pools.
+
+    :returns: tuple (list of tuples (name, ConnectionString), list of tuples (name, error))
+
+    """
+    parsed, errors = [], []
+
+    for name, raw in entries:
+        # Any failure is recorded, so that one entry cannot abort the loading of the rest
+        try:
+            parsed.append((name, cs_class.from_string(raw)))
+        except Exception as e:
+            errors.append((name, e))
+
+    return parsed, errors
+
+
+async def _load_source(source, semaphore, executor, parse_batch_size, cs_class):
+    loop = asyncio.get_event_loop()
+
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            entries = await source.fetch()
+        except Exception as e:
+            return [], SourceReport(source, 0, time.monotonic() - start, 0.0, [(None, e)])
+
+        fetched = time.monotonic()
+
+        # Small batches are not worth the round trip to the executor
+        if len(entries) < parse_batch_size:
+            parsed, errors = _parse_entries(cs_class, entries)
+        else:
+            try:
+                parsed, errors = await loop.run_in_executor(executor, _parse_entries, cs_class, entries)
+            except Exception as e:
+                # E.g. the batch could not be sent to a process pool
+                parsed, errors = [], [(None, e)]
+
+        end = time.monotonic()
+
+    return parsed, SourceReport(source, len(parsed), fetched - start, end - fetched, errors)
+
+
+async def load(sources, concurrency=10, executor=None, parse_batch_size=100, cs_class=ConnectionString):
+    """
+    Fetches and parses the connection strings of all the sources concurrently.
+    If the same name comes from several sources, the last source in `sources` wins.
+
+    Failing sources and invalid connection strings do not stop the loading, but
+    are listed in the errors of the report of their source.
+
+    :param list sources: :class:`Source` objects
+    :param int concurrency: maximum number of sources being loaded at the same time
+    :param executor: executor where the big batches are parsed. Defaults to the loop's one
+    :param int parse_batch_size: minimum number of entries to parse a batch in the executor
+    :param type cs_class: class used to parse the entries
+    :returns: dict {name: ConnectionString}, and list of :class:`SourceReport` in the order of `sources`
+    :rtype: LoadResult
+
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*[
+        _load_source(source, semaphore, executor, parse_batch_size, cs_class)
+        for source in sources
+    ])
+
+    entries = {}
+    for parsed, _ in results:
+        entries.update(parsed)
+
+    return LoadResult(entries, [report for _, report in results])
@@ -0,0 +1,227 @@
+# coding: utf-8
+
+"""
+Command line bulk processing of connection strings, one per line::
+
+    python -m pyconstring translate --mapping ado2odbc.json --jobs 4 input.txt > output.txt
+
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import io
+import json
+import multiprocessing
+import sys
+
+from collections import deque
+from itertools import islice
+
+from .pyconstring import ConnectionString
+
+
+__all__ = ['main']
+
+
+MODES = ['normalize', 'translate', 'validate', 'extract-key']
+
+
+def _process_chunk(task):
+    """
+    Processes a chunk of lines. Runs in the worker processes, so it must stay at module level.
+
+    :param tuple task: (options, lines)
+    :returns: list of tuples (output line or None, error message or None)
+
+    """
+    (mode, mapping, strict, key), lines = task
+    results = []
+
+    for line in lines:
+        # Errors are reported per line, so that one bad line cannot abort the whole chunk
+        try:
+            cs = ConnectionString.from_string(line)
+
+            if mode == 'normalize':
+                output = cs.get_string()
+
+            elif mode == 'translate':
+                cs.translate(mapping, strict=strict)
+                output = cs.get_string()
+
+            elif mode == 'extract-key':
+                output = cs[key] if key in cs else ''
+
+            else:
+                output = None
+
+        except ValueError as e:
+            results.append((None, str(e)))
+            continue
+
+        results.append((output, None))
+
+    return results
+
+
+def _open_stdin(encoding):
+    """
+    Opens stdin as text in the given encoding, instead of the locale's one.
+    The returned file must be detached, not closed, so that stdin stays open.
+
+    """
+    # Python 2 files have no binary buffer to wrap
+    if not hasattr(sys.stdin, 'buffer'):
+        return io.open(sys.stdin.fileno(), encoding=encoding, closefd=False)
+
+    return io.TextIOWrapper(sys.stdin.buffer, encoding=encoding)
+
+
+def _iter_chunks(paths, chunk_size, encoding):
+    """
+    Lazily reads the input files and yields tuples (file name, number of the first line, lines).
+    Chunks never span more than one file.
+
+    """
+    for path in paths:
+        if path == '-':
+            f, name = _open_stdin(encoding), '<stdin>'
+        else:
+            f, name = io.open(path, encoding=encoding), path
+
+        try:
+            lines = (line.rstrip('\r\n') for line in f)
+            lineno = 1
+            while True:
+                chunk = list(islice(lines, chunk_size))
+                if not chunk:
+                    break
+
+                yield name, lineno, chunk
+                lineno += len(chunk)
+
+        finally:
+            if path == '-':
+                f.detach()
+            else:
+                f.close()
+
+
+def _iter_results(options, chunks, jobs):
+    """
+    Processes the chunks, in a pool of `jobs` processes if more than one.
+    Results are yielded in input order, and only a bounded number of chunks is in flight.
+
+    """
+    if jobs == 1:
+        for name, lineno, lines in chunks:
+            yield name, lineno, _process_chunk((options, lines))
+
+        return
+
+    pool = multiprocessing.Pool(jobs)
+    pending = deque()
+
+    try:
+        for name, lineno, lines in chunks:
+            pending.append((name, lineno, pool.apply_async(_process_chunk, ((options, lines),))))
+
+            if len(pending) >= jobs * 2:
+                name, lineno, result = pending.popleft()
+                yield name, lineno, result.get()
+
+        while pending:
+            name, lineno, result = pending.popleft()
+            yield name, lineno, result.get()
+
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _load_mapping(path):
+    with io.open(path, encoding='utf-8') as f:
+        mapping = json.load(f)
+
+    if not isinstance(mapping, dict) or not all(isinstance(v, type('')) for v in mapping.values()):
+        raise ValueError('The mapping must be a JSON object {pre name: post name}')
+
+    blank = sorted(k for k, v in mapping.items() if not v.strip())
+    if blank:
+        raise ValueError('Post names cannot be empty: %s' % ', '.join(blank))
+
+    return mapping
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m pyconstring',
+        description='Processes connection strings, one per line, and writes the results to stdout',
+    )
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('files', nargs='*', default=['-'], help='input files. Defaults to stdin')
+    parser.add_argument('--mapping', help='JSON file with the translation mapping {pre name: post name}')
+    parser.add_argument('--non-strict', action='store_true', help='keep keys missing in the translation mapping')
+    parser.add_argument('--key', help='key to extract')
+    parser.add_argument('--jobs', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='number of lines sent to a worker at once')
+    parser.add_argument('--encoding', default='utf-8', help='encoding of the input files and stdin')
+
+    return parser
+
+
+def main(argv=None, stdout=None, stderr=None):
+    """
+    Entry point of ``python -m pyconstring``
+
+    :returns: exit code. 1 if any line could not be processed
+    :rtype: int
+
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    parser = _get_parser()
+    # Allows options after the input files. Not available before Python 3.7
+    parse = getattr(parser, 'parse_intermixed_args', parser.parse_args)
+    args = parse(argv)
+
+    if args.jobs < 1 or args.chunk_size < 1:
+        parser.error('--jobs and --chunk-size must be positive')
+
+    if args.mode == 'extract-key' and not args.key:
+        parser.error('extract-key requires --key')
+
+    mapping = None
+    if args.mode == 'translate':
+        if not args.mapping:
+            parser.error('translate requires --mapping')
+
+        try:
+            mapping = _load_mapping(args.mapping)
+        except (IOError, ValueError) as e:
+            parser.error('Could not load mapping: %s' % e)
+
+    options = args.mode, mapping, not args.non_strict, args.key
+    # Invalid lines are reported on stdout when validating, since that is the purpose
+    err_out = stdout if args.mode == 'validate' else stderr
+    failed = False
+
+    try:
+        chunks = _iter_chunks(args.files, args.chunk_size, args.encoding)
+
+        for name, lineno, results in _iter_results(options, chunks, args.jobs):
+            for i, (output, error) in enumerate(results):
+                if error is not None:
+                    failed = True
+                    err_out.write('%s:%d: %s\n' % (name, lineno + i, error))
+
+                elif output is not None:
+                    stdout.write(output + '\n')
+
+    except IOError as e:
+        stderr.write('%s\n' % e)
+        return 2
+
+    return 1 if failed else 0
@@ -0,0 +1,197 @@
+# coding: utf-8
+
+from __future__ import unicode_literals
+
+from itertools import chain
+
+from .pyconstring import ConnectionString, _as_connection_string, diff
+
+
+__all__ = ['ConnectionStringIndex']
+
+
+class ConnectionStringIndex(object):
+    """
+    Inverted index of named connection strings, to find the ones with some keys or key-value pairs
+    without checking them all.
+
+    Every entry gets an integer id. The index keeps the ids of the entries containing each key, and each
+    (formatted key, value) pair. Posting lists with a single id, usual for values like server names, are
+    stored as the bare id. Keys and values are interned, so repeated ones are stored only once, and
+    released as soon as no indexed entry uses them. The items of each entry are kept as a flat tuple
+    (key, value, key, value...), so the only pair tuples are the keys of the pair postings.
+
+    :param type cs_class: class whose key formatter is used for the keys
+
+    """
+
+    def __init__(self, cs_class=ConnectionString):
+        self.cs_class = cs_class
+
+        self._ids = {}
+        # Indexed by id. Ids of removed entries are reused. Items are flat tuples (key, value, key, value...)
+        self._names = []
+        self._items = []
+        self._free_ids = []
+
+        self._by_key = {}
+        self._by_pair = {}
+
+        # {key or value: [canonical object, number of indexed items using it]}
+        self._interned = {}
+
+    def _intern(self, obj):
+        entry = self._interned.get(obj)
+        if entry is None:
+            entry = self._interned[obj] = [obj, 0]
+
+        entry[1] += 1
+        return entry[0]
+
+    def _release(self, obj):
+        entry = self._interned[obj]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._interned[obj]
+
+    @staticmethod
+    def _iter_pairs(items):
+        return zip(items[::2], items[1::2])
+
+    @staticmethod
+    def _post(postings, token, entry_id):
+        current = postings.get(token)
+        if current is None:
+            postings[token] = entry_id
+
+        elif isinstance(current, set):
+            current.add(entry_id)
+
+        else:
+            postings[token] = {current, entry_id}
+
+    @staticmethod
+    def _unpost(postings, token, entry_id):
+        current = postings[token]
+        if not isinstance(current, set):
+            del postings[token]
+            return
+
+        current.discard(entry_id)
+        if len(current) == 1:
+            postings[token] = current.pop()
+
+    def _index_items(self, entry_id, items):
+        for pair in self._iter_pairs(items):
+            self._post(self._by_key, pair[0], entry_id)
+            self._post(self._by_pair, pair, entry_id)
+
+    def _unindex_items(self, entry_id, items):
+        for pair in self._iter_pairs(items):
+            self._unpost(self._by_key, pair[0], entry_id)
+            self._unpost(self._by_pair, pair, entry_id)
+
+            self._release(pair[0])
+            self._release(pair[1])
+
+    @staticmethod
+    def _flatten(pairs):
+        return tuple(chain.from_iterable(pairs))
+
+    def _freeze_items(self, items):
+        return self._flatten((self._intern(key), self._intern(value)) for key, value in items)
+
+    def add(self, name, cs):
+        """
+        Indexes a connection string. If `name` is already indexed, only the keys that changed
+        are reindexed.
+
+        The contents are copied, so later modifications of `cs` require adding it again.
+
+        :param ConnectionString cs: connection string to be indexed
+
+        """
+        # Keys must be formatted like those of the index class, whatever the class of `cs`
+        cs = _as_connection_string(cs, self.cs_class)
+        entry_id = self._ids.get(name)
+
+        if entry_id is None:
+            entry_id = self._free_ids.pop() if self._free_ids else len(self._names)
+            if entry_id == len(self._names):
+                self._names.append(None)
+                self._items.append(None)
+
+            items = self._freeze_items(cs.items())
+            self._ids[name] = entry_id
+            self._names[entry_id] = name
+            self._items[entry_id] = items
+            self._index_items(entry_id, items)
+            return
+
+        old_pairs = list(self._iter_pairs(self._items[entry_id]))
+        patch = diff(self.cs_class(old_pairs), cs)
+        if not patch:
+            return
+
+        dropped = set(patch.removed).union(patch.changed)
+        self._unindex_items(entry_id, self._flatten(pair for pair in old_pairs if pair[0] in dropped))
+
+        new_items = self._freeze_items(list(patch.changed.items()) + list(patch.added.items()))
+        self._index_items(entry_id, new_items)
+        self._items[entry_id] = self._flatten(pair for pair in old_pairs if pair[0] not in dropped) + new_items
+
+    def remove(self, name):
+        """
+        Removes an entry from the index
+
+        :raises: KeyError
+
+        """
+        entry_id = self._ids.pop(name)
+        self._unindex_items(entry_id, self._items[entry_id])
+        self._names[entry_id] = self._items[entry_id] = None
+        self._free_ids.append(entry_id)
+
+    def query(self, equals=None, keys=()):
+        """
+        Finds the entries having all the given key-value pairs and keys.
+        Without conditions, all the entries are returned.
+
+        :param dict equals: {key: value} pairs the entries must have
+        :param keys: keys the entries must have, whatever their value
+        :returns: names of the matching entries
+        :rtype: set
+
+        """
+        format_key = self.cs_class._format_key
+        tokens = [(self._by_pair, (format_key(key), value)) for key, value in (equals or {}).items()]
+        tokens.extend((self._by_key, format_key(key)) for key in keys)
+
+        if not tokens:
+            return set(self._ids)
+
+        postings = []
+        for index, token in tokens:
+            current = index.get(token)
+            if current is None:
+                return set()
+
+            postings.append(current if isinstance(current, set) else {current})
+
+        # Intersecting from the smallest set keeps the intermediate results small
+        postings.sort(key=len)
+        ids = postings[0].intersection(*postings[1:])
+
+        return {self._names[entry_id] for entry_id in ids}
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __repr__(self):
+        return '<ConnectionStringIndex (%d entries)>' % len(self)
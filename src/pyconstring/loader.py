@@ -0,0 +1,170 @@
+# coding: utf-8
+
+from __future__ import unicode_literals
+
+import hashlib
+import io
+
+from collections import namedtuple
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from .pyconstring import ConnectionString
+
+
+__all__ = ['ConnectionStringFile', 'ReloadDiff', 'iter_entries']
+
+
+ReloadDiff = namedtuple('ReloadDiff', 'added changed removed')
+
+_comment_prefixes = ('#', ';')
+
+
+def iter_entries(lines):
+    """
+    Streams the raw entries of a connection string file
+
+    Two kinds of entries are supported, and can be mixed in the same file::
+
+        # One entry per line
+        name = Provider=SQLOLEDB;Server=db7;
+
+        # Ini-style section, every line is a key-value pair of the connection string
+        [other name]
+        Provider = SQLOLEDB
+        Server = db7
+
+    Once a section is opened, every following line belongs to a section. Blank lines
+    and lines starting with ``#`` or ``;`` are ignored.
+
+    :param lines: iterable of text lines
+    :returns: iterable of tuples (name, raw connection string)
+    :raises: ValueError
+
+    """
+    section, pairs = None, []
+
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+
+        if not line or line.startswith(_comment_prefixes):
+            continue
+
+        if line.startswith('['):
+            if not line.endswith(']'):
+                raise ValueError('Line %d: unterminated section header' % lineno)
+
+            if section is not None:
+                yield section, ';'.join(pairs)
+
+            section, pairs = line[1:-1].strip(), []
+            if not section:
+                raise ValueError('Line %d: section name cannot be empty' % lineno)
+
+            continue
+
+        if section is not None:
+            if '=' not in line:
+                raise ValueError('Line %d: expected "key = value" in section "%s"' % (lineno, section))
+
+            pairs.append(line.rstrip(';').rstrip())
+            continue
+
+        name, sep, raw = line.partition('=')
+        name = name.strip()
+        if not sep or not name:
+            raise ValueError('Line %d: expected "name = <connection string>"' % lineno)
+
+        yield name, raw.strip()
+
+    if section is not None:
+        yield section, ';'.join(pairs)
+
+
+class ConnectionStringFile(Mapping):
+    """
+    Read-only mapping {name: ConnectionString} backed by a connection string file.
+    See :func:`iter_entries` for the file format.
+
+    The file is only read when calling :meth:`reload`. Entries whose raw text did not
+    change since the previous load are not parsed again, and keep the very same
+    ConnectionString object.
+
+    :param str path: path of the file
+    :param str encoding: encoding of the file
+    :param type cs_class: class used to parse the entries
+
+    """
+
+    def __init__(self, path, encoding='utf-8', cs_class=ConnectionString):
+        self.path = path
+        self.encoding = encoding
+        self.cs_class = cs_class
+
+        # {name: (digest of the raw text, ConnectionString)}
+        self._entries = {}
+
+    @staticmethod
+    def _digest(raw):
+        return hashlib.sha1(raw.encode('utf-8')).digest()
+
+    def reload(self):
+        """
+        (Re)reads the file and parses the entries that are new or whose text changed.
+        If any entry cannot be parsed, the current state is kept.
+
+        :returns: names that were added, changed and removed since the previous load
+        :rtype: ReloadDiff
+        :raises: ValueError
+
+        """
+        old = self._entries
+        new = {}
+        added, changed = set(), set()
+
+        with io.open(self.path, encoding=self.encoding) as f:
+            for name, raw in iter_entries(f):
+                digest = self._digest(raw)
+
+                # A name defined more than once is overridden by its last definition
+                current = old.get(name)
+                if current is not None and current[0] == digest:
+                    new[name] = current
+                    continue
+
+                try:
+                    new[name] = digest, self.cs_class.from_string(raw)
+                except ValueError as e:
+                    raise ValueError('Entry "%s": %s' % (name, e))
+
+        for name, (digest, _) in new.items():
+            if name not in old:
+                added.add(name)
+
+            elif old[name][0] != digest:
+                changed.add(name)
+
+        removed = set(old).difference(new)
+        self._entries = new
+
+        return ReloadDiff(frozenset(added), frozenset(changed), frozenset(removed))
+
+    load = reload
+
+    def __getitem__(self, name):
+        return self._entries[name][1]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __repr__(self):
+        return '<ConnectionStringFile \'%s\' (%d entries)>' % (self.path, len(self))
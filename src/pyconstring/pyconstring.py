@@ -2,13 +2,25 @@
 
 from __future__ import unicode_literals
 
+import fnmatch
+import io
+import re
 import sys
 
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from operator import methodcaller
 
 
-__all__ = ['ConnectionString']
+__all__ = [
+    'CollectionDiff',
+    'ConnectionString',
+    'FrozenConnectionString',
+    'Patch',
+    'SerializeStats',
+    'diff',
+    'diff_many',
+    'serialize_many',
+]
 __version__ = '0.5.0'
 
 
@@ -16,12 +28,19 @@ class ConnectionString(OrderedDict):
 
     def __init__(self, *args, **kwargs):
         self._formatted_prio_keys = {self._format_key(k) for k in self._non_overridable_keys}
+        # Composed strings, reused until the object is modified.
+        # {None: plain, 'redacted': redacted with the default keys and mask}
+        self._serialized = {}
         super(ConnectionString, self).__init__(*args, **kwargs)
 
     # Keys that won't be overridden if they appear more than once in the connection string to be loaded
     _non_overridable_keys = ['Provider']
     _format_key = staticmethod(methodcaller('title'))
 
+    # Keys masked by default by `get_redacted_string`. Shell-style wildcards are accepted
+    _redacted_keys = ('Password', 'Pwd', '*Secret')
+    _redaction_mask = '***'
+
     @classmethod
     def from_string(cls, string):
         """
@@ -36,6 +55,126 @@ class ConnectionString(OrderedDict):
 
         return self
 
+    @classmethod
+    def extract(cls, strings, keys, columns=False):
+        """
+        Extracts the values of some keys from many connection strings, without building
+        ConnectionString objects. Only the values of the requested keys are decoded.
+
+        The same rules as in `from_string` apply: if a key appears more than once, the
+        last value is taken, unless it is a non overridable key.
+
+        :param strings: iterable of connection strings
+        :param keys: keys to be extracted
+        :param bool columns: if True, returns a list of values per key instead of a tuple per string
+        :returns: iterable of tuples with the values of `keys` (None if missing) for each string,
+                  or, if `columns`, a tuple of lists with the values of each key
+        :raises: ValueError
+
+        """
+        formatted_keys = [cls._format_key(key) for key in keys]
+        wanted = set(formatted_keys)
+        prio_keys = {cls._format_key(k) for k in cls._non_overridable_keys}
+
+        # {raw key: (decoded key, formatted key)}, since the same keys appear in most strings
+        key_cache = {}
+
+        rows = (
+            tuple(map(cls._project_string(string.lstrip(), wanted, prio_keys, key_cache).get, formatted_keys))
+            for string in strings
+        )
+
+        if not columns:
+            return rows
+
+        result = tuple([] for _ in formatted_keys)
+        for row in rows:
+            for column, value in zip(result, row):
+                column.append(value)
+
+        return result
+
+    # Maximum number of distinct raw keys remembered by `extract`
+    _key_cache_size = 1000
+
+    @classmethod
+    def _project_string(cls, string, wanted, prio_keys, key_cache):
+        """
+        Scans a left stripped connection string like `_parse_string`, but only decodes
+        the values of the `wanted` formatted keys
+
+        :returns: dictionary {formatted key: value} of the wanted keys found
+        :rtype: dict
+        :raises: ValueError
+
+        """
+        found = {}
+        pos, end = 0, len(string)
+
+        while pos < end:
+            # Key, up to the first '=' that is not part of an escaped '=='
+            start = pos
+            while True:
+                eq = string.find('=', start)
+                if eq == -1:
+                    raise ValueError('Token delimiter not found: "="')
+
+                if string[eq+1:eq+2] == '=':
+                    start = eq + 2
+                    continue
+
+                break
+
+            raw_key = string[pos:eq]
+            try:
+                key, formatted = key_cache[raw_key]
+            except KeyError:
+                key = cls._decode_key(raw_key)
+                formatted = cls._format_key(key)
+                if len(key_cache) < cls._key_cache_size:
+                    key_cache[raw_key] = key, formatted
+
+            pos = eq + 1
+            while pos < end and string[pos].isspace():
+                pos += 1
+
+            keep = formatted in wanted and (key not in prio_keys or formatted not in found)
+            first = string[pos:pos+1]
+
+            # Value not starting with quotes
+            if first not in cls._quotes:
+                semicolon = string.find(';', pos)
+                if semicolon == -1:
+                    semicolon = end
+
+                if keep:
+                    found[formatted] = string[pos:semicolon].rstrip()
+
+                pos = semicolon + 1
+                continue
+
+            start = pos + 1
+            while True:
+                quote = string.find(first, start)
+                if quote == -1:
+                    raise ValueError('Token delimiter not found: "%s"' % first)
+
+                # If it is a double quote, skip and keep searching
+                if string[quote+1:quote+2] == first:
+                    start = quote + 2
+                    continue
+
+                break
+
+            if keep:
+                found[formatted] = cls._decode_value(string[pos:quote+1])
+
+            pos = quote + 1
+            while pos < end and string[pos] in ' ;':
+                pos += 1
+
+        return found
+
     def _store_items(self, items, allow_prio_overriding=True):
         """
         Stores key-val items
@@ -48,8 +187,30 @@ class ConnectionString(OrderedDict):
         self.update((k, v) for k, v in items if pred(k))
 
     def __setitem__(self, key, value, *args, **kwargs):
+        self._serialized.clear()
         super(ConnectionString, self).__setitem__(self._format_key(key), value, *args, **kwargs)
 
+    def __delitem__(self, key, *args, **kwargs):
+        self._serialized.clear()
+        super(ConnectionString, self).__delitem__(self._format_key(key), *args, **kwargs)
+
+    # Methods that modify the dictionary without going through __setitem__ or __delitem__
+    def _invalidating(name):
+        def method(self, *args, **kwargs):
+            self._serialized.clear()
+            return getattr(super(ConnectionString, self), name)(*args, **kwargs)
+
+        method.__name__ = str(name)
+        return method
+
+    clear = _invalidating('clear')
+    pop = _invalidating('pop')
+    popitem = _invalidating('popitem')
+    setdefault = _invalidating('setdefault')
+    move_to_end = _invalidating('move_to_end')
+
+    del _invalidating
+
     def _no_prio_conflict(self, key):
         """
         Returns whether the key can be set or not taking into account that priority keys cannot be overridden
@@ -109,8 +270,8 @@ class ConnectionString(OrderedDict):
         :raises: ValueError
 
         """
-        # Not starting with quotes
-        first = string[0]
+        # Not starting with quotes. Slicing, since the value may be empty at the end of the string
+        first = string[:1]
         if first not in cls._quotes:
             value, _, string = string.partition(';')
             return value.rstrip(), string
@@ -122,7 +283,7 @@ class ConnectionString(OrderedDict):
                 raise ValueError('Token delimiter not found: "%s"' % first)
 
             # If it is a double quote, skip and keep searching
-            if string[pos] == string[pos+1]:
+            if string[pos+1:pos+2] == first:
                 start = pos + 2
                 continue
 
@@ -184,6 +345,21 @@ class ConnectionString(OrderedDict):
         # If both types of quotes in string, escape the double quotes by doubling them
         return '"%s"' % val.replace('"', '""')
 
+    def apply(self, patch):
+        """
+        Applies in place the differences returned by :func:`diff`.
+        Removed keys that are already missing are ignored.
+
+        :param Patch patch: differences to be applied
+
+        """
+        for key in patch.removed:
+            if key in self:
+                del self[key]
+
+        self.update(patch.changed)
+        self.update(patch.added)
+
     def translate(self, trans, strict=True):
         """
         Translates the keys of the store.
@@ -202,17 +378,92 @@ class ConnectionString(OrderedDict):
         self.clear()
         self._store_items(translated_items)
 
+    def _compose(self, items):
+        if not self:
+            return ''
+
+        return ';'.join('%s=%s' % (self._encode_key(k), self._encode_value(v))
+                        for k, v in items) + ';'
+
     def get_string(self):
         """
         :returns: the composed connection string
         :rtype: unicode
 
         """
-        if not self:
-            return ''
+        try:
+            return self._serialized[None]
+        except KeyError:
+            string = self._serialized[None] = self._compose(self.items())
+            return string
 
-        return ';'.join('%s=%s' % (self._encode_key(k), self._encode_value(v))
-                        for k, v in self.items()) + ';'
+    @classmethod
+    def _compile_redaction_matcher(cls, keys):
+        """
+        Returns a function that tells whether a formatted key matches any of the `keys` patterns
+
+        """
+        if not keys:
+            return lambda key: False
+
+        # Case is ignored, since formatting the key does not necessarily format its suffix
+        # the same way as the pattern (e.g. 'clientsecret'.title() == 'Clientsecret')
+        pattern = '|'.join(fnmatch.translate(cls._format_key(key)) for key in keys)
+        return re.compile(pattern, re.IGNORECASE).match
+
+    @classmethod
+    def _get_default_redaction_matcher(cls):
+        """
+        Returns the matcher of `_redacted_keys`, compiled once and stored in the class itself.
+        Looked up in the class dictionary, so that subclasses do not use the matcher of their parent.
+
+        """
+        matcher = cls.__dict__.get('_default_redaction_matcher')
+        if matcher is None:
+            matcher = cls._compile_redaction_matcher(cls._redacted_keys)
+            cls._default_redaction_matcher = matcher
+
+        return matcher
+
+    def get_redacted_string(self, keys=None, mask=None):
+        """
+        Returns the composed connection string with the values of sensitive keys masked.
+        With the default keys and mask, the result is cached until the object is modified.
+
+        :param keys: iterable of key patterns to be masked, shell-style wildcards accepted.
+                     Defaults to `_redacted_keys`
+        :param unicode mask: replacement of the masked values. Defaults to `_redaction_mask`
+        :rtype: unicode
+
+        """
+        if keys is None and mask is None:
+            try:
+                return self._serialized['redacted']
+            except KeyError:
+                pass
+
+            match = self._get_default_redaction_matcher()
+            string = self._serialized['redacted'] = self._compose(
+                (k, self._redaction_mask if match(k) else v) for k, v in self.items()
+            )
+            return string
+
+        match = self._get_default_redaction_matcher() if keys is None else self._compile_redaction_matcher(keys)
+        mask = self._redaction_mask if mask is None else mask
+
+        return self._compose((k, mask if match(k) else v) for k, v in self.items())
+
+    def __copy__(self):
+        return self.copy()
+
+    def __reduce__(self):
+        # The cached strings must not be shared with copies, nor pickled
+        reduced = list(super(ConnectionString, self).__reduce__())
+        state = reduced[2]
+        if state:
+            reduced[2] = {name: value for name, value in state.items() if name != '_serialized'}
+
+        return tuple(reduced)
 
     def __unicode__(self):
         return self.get_string()
@@ -224,6 +475,256 @@ class ConnectionString(OrderedDict):
         return '<ConnectionString \'%s\'>' % self.get_string()
 
     __getitem__ = lambda self, key: super(ConnectionString, self).__getitem__(self._format_key(key))
-    __delitem__ = lambda self, key: super(ConnectionString, self).__delitem__(self._format_key(key))
     __contains__ = lambda self, key: super(ConnectionString, self).__contains__(self._format_key(key))
 
+
+class FrozenConnectionString(ConnectionString):
+    """
+    Read-only ConnectionString. Any attempt to modify it raises TypeError,
+    so the same instance can be safely shared between threads.
+
+    """
+    _frozen = False
+
+    def __init__(self, *args, **kwargs):
+        super(FrozenConnectionString, self).__init__(*args, **kwargs)
+        self._frozen = True
+
+    def _store_items(self, items, allow_prio_overriding=True):
+        # Only reachable while loading in `from_string`, since `translate` clears first
+        self._frozen = False
+        try:
+            super(FrozenConnectionString, self)._store_items(items, allow_prio_overriding)
+        finally:
+            self._frozen = True
+
+    def _check_mutable(self):
+        if self._frozen:
+            raise TypeError('%s object is read-only' % type(self).__name__)
+
+    def __setitem__(self, key, value, *args, **kwargs):
+        self._check_mutable()
+        super(FrozenConnectionString, self).__setitem__(key, value, *args, **kwargs)
+
+    def _read_only(name):
+        def method(self, *args, **kwargs):
+            self._check_mutable()
+            return getattr(super(FrozenConnectionString, self), name)(*args, **kwargs)
+
+        method.__name__ = str(name)
+        return method
+
+    __delitem__ = _read_only('__delitem__')
+    __ior__ = _read_only('__ior__')
+    clear = _read_only('clear')
+    pop = _read_only('pop')
+    popitem = _read_only('popitem')
+    setdefault = _read_only('setdefault')
+    update = _read_only('update')
+    move_to_end = _read_only('move_to_end')
+
+    del _read_only
+
+    def copy(self):
+        return self.__class__(self)
+
+    def __reduce__(self):
+        # The default implementation would fill an empty instance item by item
+        return self.__class__, (list(self.items()),)
+
+    def __repr__(self):
+        return '<FrozenConnectionString \'%s\'>' % self.get_string()
+
+
+SerializeStats = namedtuple('SerializeStats', 'items bytes')
+
+
+def _is_binary_sink(sink):
+    if isinstance(sink, io.TextIOBase):
+        return False
+
+    if isinstance(sink, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+
+    return 'b' in getattr(sink, 'mode', '')
+
+
+def _encoded_size(text, encoding):
+    # Checking for ASCII is much cheaper than encoding (Python 3.7+)
+    if getattr(text, 'isascii', bool)():
+        return len(text)
+
+    return len(text.encode(encoding))
+
+
+def _flush(buf, sink, binary, encoding):
+    """
+    Writes the buffer to the sink and empties it
+
+    :returns: number of bytes written
+    :rtype: int
+
+    """
+    data = ''.join(buf)
+    del buf[:]
+
+    if binary:
+        data = data.encode(encoding)
+        sink.write(data)
+        return len(data)
+
+    sink.write(data)
+    return _encoded_size(data, encoding)
+
+
+def serialize_many(objects, sink, separator='\n', buffer_size=64 * 1024, encoding='utf-8'):
+    """
+    Writes the composed strings of many ConnectionString objects to a file-like object,
+    without building the whole output in memory.
+
+    The pieces of the strings are accumulated in a single buffer, which is written
+    to the sink every time it reaches `buffer_size` characters.
+
+    :param objects: iterable of ConnectionString objects
+    :param sink: text or binary file-like object
+    :param unicode separator: written between consecutive connection strings
+    :param int buffer_size: number of characters buffered before writing to the sink
+    :param str encoding: encoding used with binary sinks, and to count the bytes written to
+                         text sinks without encoding of their own
+    :returns: number of objects and bytes written
+    :rtype: SerializeStats
+
+    """
+    binary = _is_binary_sink(sink)
+    if not binary:
+        encoding = getattr(sink, 'encoding', None) or encoding
+
+    buf = []
+    buffered = items = written = 0
+
+    for obj in objects:
+        if items:
+            buf.append(separator)
+            buffered += len(separator)
+
+        items += 1
+
+        cached = obj._serialized.get(None)
+        if cached is not None:
+            buf.append(cached)
+            buffered += len(cached)
+
+        else:
+            encode_key, encode_value = obj._encode_key, obj._encode_value
+            for key, value in obj.items():
+                key, value = encode_key(key), encode_value(value)
+                buf.extend((key, '=', value, ';'))
+                buffered += len(key) + len(value) + 2
+
+        if buffered >= buffer_size:
+            written += _flush(buf, sink, binary, encoding)
+            buffered = 0
+
+    if buf:
+        written += _flush(buf, sink, binary, encoding)
+
+    return SerializeStats(items, written)
+
+
+class Patch(namedtuple('Patch', 'added changed removed')):
+    """
+    Differences between two connection strings, as returned by :func:`diff`
+
+    :ivar OrderedDict added: {key: value} of the keys only present in the target
+    :ivar OrderedDict changed: {key: new value} of the keys whose value differs
+    :ivar tuple removed: keys only present in the source
+
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    __nonzero__ = __bool__
+
+
+CollectionDiff = namedtuple('CollectionDiff', 'added changed removed')
+
+_missing = object()
+
+
+def _as_connection_string(obj, cs_class=ConnectionString):
+    """
+    Returns `obj` if its keys are formatted like those of `cs_class`, or a `cs_class` copy otherwise
+
+    """
+    if isinstance(obj, ConnectionString) and type(obj)._format_key is cs_class._format_key:
+        return obj
+
+    return cs_class(obj)
+
+
+def diff(a, b):
+    """
+    Compares two connection strings, regardless of the order of their keys.
+    Keys are compared formatted like those of `a`, so plain dictionaries and connection
+    strings with other key formatters are accepted as well.
+
+    :param ConnectionString a: source
+    :param ConnectionString b: target
+    :returns: the differences that turn `a` into `b` when applied with :meth:`ConnectionString.apply`
+    :rtype: Patch
+
+    """
+    if not isinstance(a, ConnectionString):
+        a = ConnectionString(a)
+
+    b = _as_connection_string(b, type(a))
+
+    added, changed = OrderedDict(), OrderedDict()
+
+    # Keys are already formatted, so the plain dict methods are used to skip formatting them again
+    for key, value in b.items():
+        old = dict.get(a, key, _missing)
+        if old is _missing:
+            added[key] = value
+
+        elif old != value:
+            changed[key] = value
+
+    removed = tuple(key for key in a if not dict.__contains__(b, key))
+
+    return Patch(added, changed, removed)
+
+
+def diff_many(a, b):
+    """
+    Compares two collections of named connection strings in a single pass over `b`.
+    Only the entries present in both and not equal are compared key by key.
+
+    :param dict a: source {name: ConnectionString}
+    :param dict b: target {name: ConnectionString}
+    :returns: {name: ConnectionString} of the names only in `b`, {name: Patch} of the names
+              whose connection string changed, and tuple of the names only in `a`
+    :rtype: CollectionDiff
+
+    """
+    added, changed = {}, {}
+
+    for name, new in b.items():
+        old = a.get(name, _missing)
+        if old is _missing:
+            added[name] = new
+            continue
+
+        # Comparing as plain dictionaries ignores the order of the keys
+        if old is new or dict.__eq__(old, new) is True:
+            continue
+
+        patch = diff(old, new)
+        if patch:
+            changed[name] = patch
+
+    removed = tuple(name for name in a if name not in b)
+
+    return CollectionDiff(added, changed, removed)
@@ -0,0 +1,214 @@
+# coding: utf-8
+
+from __future__ import unicode_literals
+
+import threading
+import weakref
+
+from collections import namedtuple
+
+from .pyconstring import ConnectionString, FrozenConnectionString
+
+
+__all__ = ['ConnectionStringRegistry', 'RegistryStats']
+
+
+RegistryStats = namedtuple('RegistryStats', 'hits misses parses contentions')
+
+
+class _ThreadCounters(object):
+    """
+    Hits and misses of the lookups done by one thread. Only that thread modifies them, so no lock is
+    needed. When the thread ends and the counters are released, they are added to the shared totals.
+
+    """
+    __slots__ = ('hits', 'misses', 'totals', 'lock', '__weakref__')
+
+    def __init__(self, totals, lock):
+        self.hits = self.misses = 0
+        self.totals = totals
+        self.lock = lock
+
+    def __del__(self):
+        with self.lock:
+            self.totals[0] += self.hits
+            self.totals[1] += self.misses
+            self.hits = self.misses = 0
+
+
+class ConnectionStringRegistry(object):
+    """
+    Thread-safe registry {name: FrozenConnectionString}
+
+    Lookups do not take any lock. Writes take one of `stripes` locks, chosen by the
+    hash of the name, so writes of different names rarely block each other.
+    When several threads ask at the same time for a missing name with :meth:`get_or_parse`,
+    the string is parsed only once.
+
+    :param int stripes: number of write locks
+    :param type cs_class: read-only class used to store the connection strings
+
+    """
+
+    def __init__(self, stripes=16, cs_class=FrozenConnectionString):
+        if stripes < 1:
+            raise ValueError('At least one stripe is needed')
+
+        self.cs_class = cs_class
+        self._entries = {}
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+        # Only modified while holding the lock of the stripe
+        self._parses = [0] * stripes
+        self._contentions = [0] * stripes
+
+        # Hits and misses are counted without locks, so each living thread has its own counters.
+        # Those of finished threads are added to [hits, misses]
+        self._local = threading.local()
+        self._thread_counters = weakref.WeakSet()
+        self._finished_counts = [0, 0]
+        # Reentrant, since counters referenced only by `stats` are released while it holds the lock
+        self._counts_lock = threading.RLock()
+
+    def _get_counters(self):
+        try:
+            return self._local.counters
+        except AttributeError:
+            counters = self._local.counters = _ThreadCounters(self._finished_counts, self._counts_lock)
+            self._thread_counters.add(counters)
+            return counters
+
+    def _lookup(self, name):
+        value = self._entries.get(name)
+        counters = self._get_counters()
+
+        if value is None:
+            counters.misses += 1
+        else:
+            counters.hits += 1
+
+        return value
+
+    def _acquire(self, name):
+        """
+        Acquires the lock of the stripe of `name`
+
+        :returns: index of the stripe
+        :rtype: int
+
+        """
+        index = hash(name) % len(self._locks)
+        lock = self._locks[index]
+
+        if not lock.acquire(False):
+            lock.acquire()
+            self._contentions[index] += 1
+
+        return index
+
+    def _freeze(self, value):
+        if isinstance(value, self.cs_class):
+            return value
+
+        if isinstance(value, ConnectionString):
+            return self.cs_class(value)
+
+        return self.cs_class.from_string(value)
+
+    def get(self, name, default=None):
+        value = self._lookup(name)
+        return default if value is None else value
+
+    def get_or_parse(self, name, string):
+        """
+        Returns the connection string registered as `name`. If missing,
+        parses `string` and registers it.
+
+        :param unicode string: connection string to be parsed if `name` is missing
+        :rtype: FrozenConnectionString
+        :raises: ValueError
+
+        """
+        value = self._lookup(name)
+        if value is not None:
+            return value
+
+        index = self._acquire(name)
+        try:
+            # Another thread may have parsed it while waiting for the lock
+            value = self._entries.get(name)
+            if value is None:
+                value = self._entries[name] = self.cs_class.from_string(string)
+                self._parses[index] += 1
+
+        finally:
+            self._locks[index].release()
+
+        return value
+
+    def set(self, name, value):
+        """
+        Registers a connection string, replacing any previous one with the same name
+
+        :param value: connection string as text, or ConnectionString object.
+                      Mutable objects are copied into read-only ones.
+        :returns: the registered object
+        :rtype: FrozenConnectionString
+        :raises: ValueError
+
+        """
+        value = self._freeze(value)
+
+        index = self._acquire(name)
+        try:
+            self._entries[name] = value
+        finally:
+            self._locks[index].release()
+
+        return value
+
+    def discard(self, name):
+        """
+        Unregisters `name` if present
+
+        """
+        index = self._acquire(name)
+        try:
+            self._entries.pop(name, None)
+        finally:
+            self._locks[index].release()
+
+    def stats(self):
+        """
+        :returns: lookups that found or missed the name, parses done, and writes that had to
+                  wait for another thread
+        :rtype: RegistryStats
+
+        """
+        with self._counts_lock:
+            hits, misses = self._finished_counts
+            for counters in list(self._thread_counters):
+                hits += counters.hits
+                misses += counters.misses
+
+        return RegistryStats(hits, misses, sum(self._parses), sum(self._contentions))
+
+    def __getitem__(self, name):
+        value = self._lookup(name)
+        if value is None:
+            raise KeyError(name)
+
+        return value
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        # Iterate over a snapshot, since other threads may register names meanwhile
+        return iter(list(self._entries))
+
+    def __repr__(self):
+        return '<ConnectionStringRegistry (%d entries)>' % len(self)
@@ -0,0 +1,7 @@
+# coding: utf-8
+
+import sys
+
+
+# The asyncio support requires Python 3.5+
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 5) else []
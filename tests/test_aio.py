@@ -0,0 +1,162 @@
+# coding: utf-8
+
+"""
+Unittests for the asyncio loader
+"""
+
+from __future__ import unicode_literals
+
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pyconstring import ConnectionString
+from pyconstring.aio import EnvironSource, FileSource, SecretsDirSource, Source, load
+
+
+class FailingSource(Source):
+
+    async def fetch(self):
+        raise IOError('unreachable')
+
+
+class TestLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.dir)
+
+    def write(self, path, content):
+        path = os.path.join(self.dir, path)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        return path
+
+    def load(self, *args, **kwargs):
+        return self.loop.run_until_complete(load(*args, **kwargs))
+
+    def test_1(self):
+        """
+        Entries from all the sources are merged, the last source winning
+
+        """
+        path = self.write('constrings.conf', 'main = User=bartolo;\n[reporting]\nUser = gertrud\n')
+        os.mkdir(os.path.join(self.dir, 'secrets'))
+        self.write(os.path.join('secrets', 'vault'), 'User=manuel;\n')
+        self.write(os.path.join('secrets', '.hidden'), 'User=nobody;\n')
+
+        result = self.load([
+            FileSource(path),
+            EnvironSource('CS_', environ={'CS_MAIN': 'User=johnny;', 'CS_': 'User=nobody;', 'OTHER': 'x=y'}),
+            SecretsDirSource(os.path.join(self.dir, 'secrets')),
+        ])
+
+        self.assertEqual(sorted(result.entries), ['MAIN', 'main', 'reporting', 'vault'])
+        self.assertEqual(result.entries['main']['user'], 'bartolo')
+        self.assertEqual(result.entries['MAIN']['user'], 'johnny')
+        self.assertEqual(result.entries['vault']['user'], 'manuel')
+        self.assertEqual([report.count for report in result.reports], [2, 1, 1])
+
+        result = self.load([
+            EnvironSource('', environ={'db': 'User=bartolo;'}),
+            EnvironSource('', environ={'db': 'User=gertrud;'}),
+        ])
+        self.assertEqual(result.entries['db']['user'], 'gertrud')
+
+    def test_2(self):
+        """
+        Failing sources and invalid entries are reported without stopping the loading
+
+        """
+        result = self.load([
+            FailingSource(),
+            FileSource(os.path.join(self.dir, 'missing.conf')),
+            EnvironSource('', environ={'good': 'User=bartolo;', 'bad': 'User==bartolo;'}),
+        ])
+
+        self.assertEqual(list(result.entries), ['good'])
+
+        failing, missing, environ = result.reports
+        self.assertEqual(failing.count, 0)
+        self.assertEqual(failing.errors[0][0], None)
+        self.assertIsInstance(failing.errors[0][1], IOError)
+        self.assertEqual(missing.count, 0)
+        self.assertEqual(len(missing.errors), 1)
+        self.assertEqual(environ.count, 1)
+        self.assertEqual([name for name, _ in environ.errors], ['bad'])
+        self.assertIsInstance(environ.errors[0][1], ValueError)
+
+    def test_3(self):
+        """
+        Big batches are parsed in the given executor
+
+        """
+        environ = {'db%d' % i: 'Server=db%d;' % i for i in range(50)}
+
+        with ThreadPoolExecutor(2) as executor:
+            result = self.load([EnvironSource('', environ=environ)], executor=executor, parse_batch_size=10)
+
+        self.assertEqual(len(result.entries), 50)
+        self.assertEqual(result.entries['db7']['server'], 'db7')
+        self.assertGreaterEqual(result.reports[0].parse_time, 0)
+
+    def test_4(self):
+        """
+        No more sources than the concurrency limit are loaded at the same time
+
+        """
+        running = []
+        peak = []
+
+        class SlowSource(Source):
+
+            async def fetch(self):
+                running.append(self)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.remove(self)
+                return [('db', 'Server=db7;')]
+
+        result = self.load([SlowSource() for _ in range(10)], concurrency=3)
+
+        self.assertEqual(max(peak), 3)
+        self.assertEqual(len(result.reports), 10)
+
+    def test_5(self):
+        """
+        Quoted values at the end of stripped secrets are loaded, and unexpected parsing
+        failures are reported per entry
+
+        """
+        os.mkdir(os.path.join(self.dir, 'secrets'))
+        self.write(os.path.join('secrets', 'db'), 'User=bartolo;Pwd="a;b"\n')
+
+        class BrokenConnectionString(ConnectionString):
+
+            @classmethod
+            def from_string(cls, string):
+                if 'broken' in string:
+                    raise IndexError('unexpected')
+
+                return super(BrokenConnectionString, cls).from_string(string)
+
+        result = self.load([
+            SecretsDirSource(os.path.join(self.dir, 'secrets')),
+            EnvironSource('', environ={'x': 'Pwd="a"', 'y': 'Key=broken'}),
+        ], cs_class=BrokenConnectionString)
+
+        self.assertEqual(result.entries['db']['pwd'], 'a;b')
+        self.assertEqual(result.entries['x']['pwd'], 'a')
+        self.assertNotIn('y', result.entries)
+        self.assertEqual([name for name, _ in result.reports[1].errors], ['y'])
+        self.assertIsInstance(result.reports[1].errors[0][1], IndexError)
@@ -0,0 +1,155 @@
+# coding: utf-8
+
+"""
+Unittests for the command line interface
+"""
+
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pyconstring.cli import _process_chunk, main
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+        return path
+
+    def run_main(self, *argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        code = main(list(argv), stdout=stdout, stderr=stderr)
+
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_1(self):
+        """
+        Normalize mode rewrites every line
+
+        """
+        path = self.write('in.txt', 'provider=someone; user = bartolo\n\nkey="value"  ;\n')
+        code, out, err = self.run_main('normalize', path)
+
+        self.assertEqual(code, 0)
+        self.assertEqual(out, 'Provider=someone;User=bartolo;\n\nKey=value;\n')
+        self.assertEqual(err, '')
+
+    def test_2(self):
+        """
+        Translate mode applies the JSON mapping, strictly unless told otherwise
+
+        """
+        path = self.write('in.txt', 'Provider=someone;User Id=bartolo;Timeout=5;\n')
+        mapping = self.write('mapping.json', json.dumps({'provider': 'driver', 'user id': 'uid'}))
+
+        code, out, _ = self.run_main('translate', path, '--mapping', mapping)
+        self.assertEqual(code, 0)
+        self.assertEqual(out, 'Driver=someone;Uid=bartolo;\n')
+
+        code, out, _ = self.run_main('translate', path, '--mapping', mapping, '--non-strict')
+        self.assertEqual(out, 'Driver=someone;Uid=bartolo;Timeout=5;\n')
+
+    def test_3(self):
+        """
+        Validate mode reports the invalid lines with their position
+
+        """
+        path = self.write('in.txt', 'key=value;\nkey==value;\nkey="value;\na="x"\nkey=\n')
+        code, out, _ = self.run_main('validate', path)
+
+        self.assertEqual(code, 1)
+        self.assertEqual(out.splitlines(), [
+            '%s:2: Token delimiter not found: "="' % path,
+            '%s:3: Token delimiter not found: """' % path,
+        ])
+
+    def test_4(self):
+        """
+        Extract-key mode writes the value of the key, or an empty line if missing
+
+        """
+        path = self.write('in.txt', 'Server=db7;\nUser=bartolo;\n')
+        code, out, _ = self.run_main('extract-key', path, '--key', 'SERVER')
+
+        self.assertEqual(code, 0)
+        self.assertEqual(out, 'db7\n\n')
+
+    def test_5(self):
+        """
+        Invalid lines are skipped and reported on stderr, while the rest is processed
+
+        """
+        path = self.write('in.txt', 'key=value;\nkey==value;\nother=value\n')
+        code, out, err = self.run_main('normalize', path)
+
+        self.assertEqual(code, 1)
+        self.assertEqual(out, 'Key=value;\nOther=value;\n')
+        self.assertIn('%s:2:' % path, err)
+
+    def test_6(self):
+        """
+        Processing in several jobs and chunks keeps the input order
+
+        """
+        lines = ['Key%d=value%d' % (i, i) for i in range(200)]
+        path = self.write('in.txt', '\n'.join(lines))
+        code, out, _ = self.run_main('normalize', path, '--jobs', '3', '--chunk-size', '7')
+
+        self.assertEqual(code, 0)
+        self.assertEqual(out.splitlines(), [line + ';' for line in lines])
+
+    def test_7(self):
+        """
+        Missing required options are rejected
+
+        """
+        blank = self.write('blank.json', json.dumps({'provider': 'driver', 'user id': ' '}))
+
+        for argv in [['translate'], ['extract-key'], ['normalize', '--jobs', '0'], ['translate', '--mapping', blank]]:
+            with self.assertRaises(SystemExit):
+                self.run_main(*argv)
+
+    def test_8(self):
+        """
+        Errors raised after parsing are reported for their line only
+
+        """
+        options = 'translate', {'provider': ''}, True, None
+        results = _process_chunk((options, ['User=bartolo;', 'Provider=someone;', 'key==value;']))
+
+        self.assertEqual(results[0], ('', None))
+        self.assertEqual(results[1], (None, 'Key cannot be empty string'))
+        self.assertEqual(results[2][0], None)
+
+    def test_9(self):
+        """
+        Stdin is decoded with the given encoding, and left open
+
+        """
+        stdin = sys.stdin
+        sys.stdin = io.TextIOWrapper(io.BytesIO('café=été\n'.encode('latin-1')), encoding='utf-8')
+
+        try:
+            code, out, _ = self.run_main('normalize', '--encoding', 'latin-1')
+            self.assertFalse(sys.stdin.closed)
+        finally:
+            sys.stdin = stdin
+
+        self.assertEqual(code, 0)
+        self.assertEqual(out, 'Café=été;\n')
@@ -0,0 +1,134 @@
+# coding: utf-8
+
+"""
+Unittests for the connection string index
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from pyconstring import ConnectionString, ConnectionStringIndex
+
+
+class TestConnectionStringIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ConnectionStringIndex()
+        self.index.add('a', ConnectionString.from_string('Provider=SQLOLEDB;Server=db7;User=bartolo;'))
+        self.index.add('b', ConnectionString.from_string('Provider=SQLOLEDB;Server=db8;'))
+        self.index.add('c', ConnectionString.from_string('Provider=MSDASQL;Server=db7;'))
+
+    def test_1(self):
+        """
+        Equality and key presence queries are intersected. Keys are formatted
+
+        """
+        self.assertEqual(self.index.query({'provider': 'SQLOLEDB'}), {'a', 'b'})
+        self.assertEqual(self.index.query({'provider': 'SQLOLEDB', 'SERVER': 'db7'}), {'a'})
+        self.assertEqual(self.index.query(keys=['user']), {'a'})
+        self.assertEqual(self.index.query({'server': 'db7'}, keys=['user']), {'a'})
+        self.assertEqual(self.index.query({'server': 'db9'}), set())
+        self.assertEqual(self.index.query(keys=['missing']), set())
+        self.assertEqual(self.index.query(), {'a', 'b', 'c'})
+
+    def test_2(self):
+        """
+        Adding an existing name updates only its changed keys
+
+        """
+        self.index.add('a', {'Provider': 'SQLOLEDB', 'Server': 'db8', 'Timeout': '5'})
+
+        self.assertEqual(self.index.query({'server': 'db7'}), {'c'})
+        self.assertEqual(self.index.query({'server': 'db8'}), {'a', 'b'})
+        self.assertEqual(self.index.query(keys=['user']), set())
+        self.assertEqual(self.index.query(keys=['timeout']), {'a'})
+        self.assertEqual(self.index.query({'provider': 'SQLOLEDB'}), {'a', 'b'})
+        self.assertEqual(len(self.index), 3)
+
+    def test_3(self):
+        """
+        Removed entries are not found anymore, and their ids are reused
+
+        """
+        self.index.remove('a')
+
+        self.assertNotIn('a', self.index)
+        self.assertEqual(self.index.query({'server': 'db7'}), {'c'})
+        self.assertEqual(self.index.query(keys=['user']), set())
+
+        self.index.add('d', ConnectionString.from_string('Server=db7;User=gertrud;'))
+        self.assertEqual(self.index.query({'server': 'db7'}), {'c', 'd'})
+        self.assertEqual(self.index.query(keys=['user']), {'d'})
+        self.assertEqual(sorted(self.index), ['b', 'c', 'd'])
+
+        with self.assertRaises(KeyError):
+            self.index.remove('a')
+
+    def test_4(self):
+        """
+        Later modifications of the indexed objects do not affect the index until added again
+
+        """
+        obj = ConnectionString.from_string('Server=db9;')
+        self.index.add('e', obj)
+        obj['server'] = 'db10'
+
+        self.assertEqual(self.index.query({'server': 'db9'}), {'e'})
+
+        self.index.add('e', obj)
+        self.assertEqual(self.index.query({'server': 'db9'}), set())
+        self.assertEqual(self.index.query({'server': 'db10'}), {'e'})
+
+    def test_5(self):
+        """
+        Repeated keys and values are stored once. There is no public way to observe it, so the
+        private intern table is inspected: equal strings coming from different objects end up
+        being the same object
+
+        """
+        value = ''.join(['SQL', 'OLEDB'])
+        self.index.add('d', {'Provider': value})
+
+        canonical, refs = self.index._interned[value]
+        self.assertIsNot(canonical, value)
+        self.assertEqual(refs, 3)
+
+    def test_6(self):
+        """
+        Interned objects are released when no entry uses them anymore. Checked on the private
+        intern table, since memory usage is not observable otherwise
+
+        """
+        index = ConnectionStringIndex()
+
+        for i in range(1000):
+            index.add('a', ConnectionString({'Server': 'db%d' % i, 'User': 'bartolo'}))
+
+        # Interned: 2 keys and 2 values
+        self.assertEqual(len(index._interned), 4)
+        self.assertEqual(index.query({'server': 'db999', 'user': 'bartolo'}), {'a'})
+
+        index.remove('a')
+        self.assertEqual(index._interned, {})
+        self.assertEqual(index._by_pair, {})
+
+    def test_7(self):
+        """
+        Connection strings whose class formats keys differently are indexed with the index's format
+
+        """
+        class ConnStr2(ConnectionString):
+            _format_key = staticmethod(lambda k: k.upper())
+
+        self.index.add('d', ConnStr2.from_string('Server=db9;'))
+        self.assertEqual(self.index.query({'server': 'db9'}), {'d'})
+
+        self.index.add('d', ConnStr2.from_string('Server=db10;User=gertrud;'))
+        self.assertEqual(self.index.query({'server': 'db9'}), set())
+        self.assertEqual(self.index.query({'server': 'db10'}, keys=['user']), {'d'})
+        self.assertEqual(self.index.query(keys=['user']), {'a', 'd'})
+
+        index = ConnectionStringIndex(cs_class=ConnStr2)
+        index.add('a', ConnectionString.from_string('server=db7;'))
+        self.assertEqual(index.query({'Server': 'db7'}), {'a'})
@@ -0,0 +1,142 @@
+# coding: utf-8
+
+"""
+Unittests for the connection string file loader
+"""
+
+from __future__ import unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyconstring import ConnectionString, ConnectionStringFile
+from pyconstring.loader import iter_entries
+
+
+class TestIterEntries(unittest.TestCase):
+
+    def test_1(self):
+        """
+        One-line entries, sections, blank lines and comments are read
+
+        """
+        lines = [
+            '# comment',
+            'first = Provider=someone;User=bartolo;',
+            '',
+            '[second]',
+            '; another comment',
+            'Provider = someone',
+            'User = bartolo;',
+            '[third]',
+            'Key = value',
+        ]
+
+        self.assertEqual(list(iter_entries(lines)), [
+            ('first', 'Provider=someone;User=bartolo;'),
+            ('second', 'Provider = someone;User = bartolo'),
+            ('third', 'Key = value'),
+        ])
+
+    def test_2(self):
+        """
+        Malformed lines are rejected
+
+        """
+        malformed = [
+            ['no separator'],
+            [' = Key=value;'],
+            ['[unterminated'],
+            ['[ ]'],
+            ['[c]', 'Provider = SQLOLEDB', 'garbage', 'Pwd = "x;y"'],
+        ]
+
+        for lines in malformed:
+            with self.assertRaises(ValueError):
+                list(iter_entries(lines))
+
+
+class TestConnectionStringFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'constrings.conf')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, *lines):
+        with io.open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+    def test_1(self):
+        """
+        The first load reports every entry as added
+
+        """
+        self.write('first = User=bartolo;', '[second]', 'User = gertrud')
+        store = ConnectionStringFile(self.path)
+        diff = store.load()
+
+        self.assertEqual(diff.added, {'first', 'second'})
+        self.assertEqual(diff.changed, set())
+        self.assertEqual(diff.removed, set())
+        self.assertEqual(store['first'], ConnectionString({'User': 'bartolo'}))
+        self.assertEqual(store['second']['user'], 'gertrud')
+
+    def test_2(self):
+        """
+        Reloading reports the differences, and unchanged entries keep their identity
+
+        """
+        self.write('first = User=bartolo;', 'second = User=gertrud;', 'third = User=manuel;')
+        store = ConnectionStringFile(self.path)
+        store.load()
+        first, second = store['first'], store['second']
+
+        self.write('first = User=bartolo;', 'second = User=johnny;', 'fourth = User=chanquete;')
+        diff = store.reload()
+
+        self.assertEqual(diff.added, {'fourth'})
+        self.assertEqual(diff.changed, {'second'})
+        self.assertEqual(diff.removed, {'third'})
+        self.assertIs(store['first'], first)
+        self.assertIsNot(store['second'], second)
+        self.assertEqual(store['second']['User'], 'johnny')
+        self.assertNotIn('third', store)
+        self.assertEqual(len(store), 3)
+
+    def test_3(self):
+        """
+        If an entry cannot be parsed, the previous state is kept
+
+        """
+        self.write('first = User=bartolo;')
+        store = ConnectionStringFile(self.path)
+        store.load()
+        first = store['first']
+
+        self.write('first = User=gertrud;', 'broken = User==bartolo;')
+        with self.assertRaises(ValueError):
+            store.reload()
+
+        self.assertIs(store['first'], first)
+        self.assertEqual(list(store), ['first'])
+
+    def test_4(self):
+        """
+        Entries are parsed with the given class
+
+        """
+        class ConnStr2(ConnectionString):
+            _format_key = staticmethod(lambda k: k.upper())
+
+        self.write('first = user=bartolo;')
+        store = ConnectionStringFile(self.path, cs_class=ConnStr2)
+        store.load()
+
+        self.assertIsInstance(store['first'], ConnStr2)
+        self.assertEqual(list(store['first']), ['USER'])
@@ -6,9 +6,12 @@ Unittests for pyconstring
 
 from __future__ import unicode_literals
 
+import copy
+import io
+import pickle
 import unittest
 
-from pyconstring import ConnectionString
+from pyconstring import ConnectionString, FrozenConnectionString, diff, diff_many, serialize_many
 
 
 class TestConnectionString(unittest.TestCase):
@@ -253,6 +256,20 @@ class TestConnectionString(unittest.TestCase):
             with self.assertRaises(ValueError):
                 ConnectionString.from_string(s)
 
+    def test_22(self):
+        """
+        Quoted values at the end of the string and empty values are parsed
+
+        """
+        obj = ConnectionString.from_string('Key="value"')
+        self.assertEqual(obj['key'], 'value')
+
+        obj = ConnectionString.from_string("User=bartolo;Pwd='a;b'")
+        self.assertEqual(obj['pwd'], 'a;b')
+
+        obj = ConnectionString.from_string('User=bartolo;Key=')
+        self.assertEqual(obj['key'], '')
+
     def test_23(self):
         """
         Star unpacking works
@@ -328,3 +345,352 @@ class TestConnectionString(unittest.TestCase):
         assert len(obj) == 2
         self.assertEqual(obj['usr'], 'bartolo')
         self.assertEqual(obj['key2'], 'val2')
+
+    def test_30(self):
+        """
+        Sensitive values are masked in the redacted string
+
+        """
+        obj = ConnectionString.from_string('User=bartolo;Password=1234;pwd=1234;ClientSecret=abc;Secret=abc;')
+
+        self.assertEqual(obj.get_redacted_string(), 'User=bartolo;Password=***;Pwd=***;Clientsecret=***;Secret=***;')
+        self.assertEqual(obj.get_string(), 'User=bartolo;Password=1234;Pwd=1234;Clientsecret=abc;Secret=abc;')
+
+    def test_31(self):
+        """
+        Redacted keys and mask can be chosen
+
+        """
+        obj = ConnectionString.from_string('User=bartolo;Password=1234;')
+
+        self.assertEqual(obj.get_redacted_string(keys=['user'], mask='?'), 'User=?;Password=1234;')
+        self.assertEqual(obj.get_redacted_string(keys=[]), 'User=bartolo;Password=1234;')
+        self.assertEqual(obj.get_redacted_string(mask='x;y'), 'User=bartolo;Password="x;y";')
+
+        class ConnStr2(ConnectionString):
+            _redacted_keys = ('User',)
+
+        self.assertEqual(ConnStr2(obj).get_redacted_string(), 'User=***;Password=1234;')
+
+    def test_32(self):
+        """
+        Composed strings are reused until the object is modified
+
+        """
+        obj = ConnectionString.from_string('User=bartolo;Password=1234;')
+        string, redacted = obj.get_string(), obj.get_redacted_string()
+
+        self.assertIs(obj.get_string(), string)
+        self.assertIs(obj.get_redacted_string(), redacted)
+
+        modifications = [
+            lambda: obj.__setitem__('password', '5678'),
+            lambda: obj.update({'Timeout': '5'}),
+            lambda: obj.setdefault('Server', 'db7'),
+            lambda: obj.pop('Timeout'),
+            obj.popitem,
+            lambda: obj.__delitem__('password'),
+            lambda: obj.translate({'user': 'uid'}),
+            obj.clear,
+        ]
+
+        for modify in modifications:
+            modify()
+            self.assertEqual(obj.get_string(), ConnectionString(obj.items()).get_string())
+            self.assertEqual(obj.get_redacted_string(), ConnectionString(obj.items()).get_redacted_string())
+
+    def test_33(self):
+        """
+        Extraction returns the values of the requested keys for every string, None if missing
+
+        """
+        strings = [
+            'Server=db7;Database=sales;User=bartolo;',
+            '  database = "hr;2" ;server=\'db\'\'8\'',
+            'User=gertrud;',
+            '',
+        ]
+
+        self.assertEqual(list(ConnectionString.extract(strings, ['SERVER', 'database'])), [
+            ('db7', 'sales'),
+            ("db'8", 'hr;2'),
+            (None, None),
+            (None, None),
+        ])
+
+        self.assertEqual(ConnectionString.extract(strings, ['server', 'user'], columns=True), (
+            ['db7', "db'8", None, None],
+            ['bartolo', None, 'gertrud', None],
+        ))
+
+    def test_34(self):
+        """
+        Extraction follows the same rules as parsing for repeated keys
+
+        """
+        strings = [
+            'Provider=first;Provider=second;Server=db7;Server=db8;',
+            'Provider=first;provider=second;',
+            'Key==2=value;Key==2="other value";',
+        ]
+        keys = ['provider', 'server', 'key=2']
+
+        expected = []
+        for string in strings:
+            obj = ConnectionString.from_string(string)
+            expected.append(tuple(obj[key] if key in obj else None for key in keys))
+
+        self.assertEqual(list(ConnectionString.extract(strings, keys)), expected)
+
+    def test_35(self):
+        """
+        Extraction rejects invalid connection strings, even if the requested keys are valid
+
+        """
+        invalid_strs = [
+            'key==value;',
+            'key="value;',
+            'server=db7;key=val;ue;',
+            'key="hey"there";',
+        ]
+
+        for s in invalid_strs:
+            with self.assertRaises(ValueError):
+                list(ConnectionString.extract([s], ['server']))
+
+    def test_36(self):
+        """
+        Copies do not share the cached strings with the original
+
+        """
+        obj = ConnectionString.from_string('A=1;')
+        obj.get_string()
+        obj.get_redacted_string()
+
+        for obj2 in [copy.copy(obj), copy.deepcopy(obj), pickle.loads(pickle.dumps(obj))]:
+            obj2['b'] = '2'
+            self.assertEqual(obj2.get_string(), 'A=1;B=2;')
+            self.assertEqual(obj2.get_redacted_string(), 'A=1;B=2;')
+            self.assertEqual(obj.get_string(), 'A=1;')
+            self.assertEqual(obj.get_redacted_string(), 'A=1;')
+
+    def test_37(self):
+        """
+        Only the redacted string with the default keys and mask is cached, and the default
+        matcher is compiled once per class
+
+        """
+        class ConnStr2(ConnectionString):
+            _redacted_keys = ('User',)
+
+        obj = ConnStr2.from_string('User=bartolo;Password=1234;')
+
+        self.assertIs(obj.get_redacted_string(), obj.get_redacted_string())
+        self.assertIsNot(obj.get_redacted_string(keys=['pwd']), obj.get_redacted_string(keys=['pwd']))
+        self.assertIsNot(obj.get_redacted_string(mask='?'), obj.get_redacted_string(mask='?'))
+        self.assertEqual(obj.get_redacted_string(mask='?'), 'User=?;Password=1234;')
+        self.assertEqual(ConnectionString(obj).get_redacted_string(), 'User=bartolo;Password=***;')
+        self.assertIn('_default_redaction_matcher', ConnStr2.__dict__)
+
+
+class TestFrozenConnectionString(unittest.TestCase):
+
+    def test_1(self):
+        """
+        Frozen connection strings are parsed and read as usual
+
+        """
+        obj = FrozenConnectionString.from_string('Provider=someone;Provider=other;User=bartolo;')
+
+        self.assertEqual(obj['provider'], 'someone')
+        self.assertEqual(obj.get_string(), 'Provider=someone;User=bartolo;')
+        self.assertEqual(obj, ConnectionString(obj.items()))
+
+    def test_2(self):
+        """
+        Any modification is rejected
+
+        """
+        obj = FrozenConnectionString({'User': 'bartolo'})
+        modifications = [
+            lambda: obj.__setitem__('key', 'value'),
+            lambda: obj.__delitem__('user'),
+            lambda: obj.update({'key': 'value'}),
+            lambda: obj.setdefault('key', 'value'),
+            lambda: obj.pop('user'),
+            obj.popitem,
+            obj.clear,
+            lambda: obj.translate({'user': 'uid'}),
+        ]
+
+        for modify in modifications:
+            with self.assertRaises(TypeError):
+                modify()
+
+        self.assertEqual(obj.get_string(), 'User=bartolo;')
+
+    def test_3(self):
+        """
+        Copies are frozen too
+
+        """
+        obj = FrozenConnectionString({'User': 'bartolo'})
+
+        for obj2 in [obj.copy(), copy.copy(obj), copy.deepcopy(obj), pickle.loads(pickle.dumps(obj))]:
+            self.assertIsInstance(obj2, FrozenConnectionString)
+            self.assertEqual(obj2, obj)
+            with self.assertRaises(TypeError):
+                obj2['key'] = 'value'
+
+
+class TestSerializeMany(unittest.TestCase):
+
+    objects = [
+        ConnectionString.from_string('Provider=someone;User=bartolo;'),
+        ConnectionString(),
+        ConnectionString({'Password': 'x;y', 'Name': '\xe9'}),
+    ]
+    expected = 'Provider=someone;User=bartolo;\n\nPassword="x;y";Name=\xe9;'
+
+    def test_1(self):
+        """
+        Text sinks receive the same as joining the composed strings
+
+        """
+        sink = io.StringIO()
+        stats = serialize_many(self.objects, sink, buffer_size=5)
+
+        self.assertEqual(sink.getvalue(), self.expected)
+        self.assertEqual(stats.items, 3)
+        self.assertEqual(stats.bytes, len(self.expected.encode('utf-8')))
+
+    def test_2(self):
+        """
+        Binary sinks receive the encoded strings
+
+        """
+        sink = io.BytesIO()
+        stats = serialize_many(self.objects, sink, separator='\r\n', encoding='latin-1')
+        expected = self.expected.replace('\n', '\r\n').encode('latin-1')
+
+        self.assertEqual(sink.getvalue(), expected)
+        self.assertEqual(stats, (3, len(expected)))
+
+    def test_3(self):
+        """
+        Cached composed strings are reused, and empty iterables write nothing
+
+        """
+        encoded = []
+
+        class ConnStr2(ConnectionString):
+
+            @staticmethod
+            def _encode_key(key):
+                encoded.append(key)
+                return ConnectionString._encode_key(key)
+
+        obj = ConnStr2.from_string('User=bartolo;')
+        string = obj.get_string()
+        sink = io.StringIO()
+
+        serialize_many([obj, obj], sink)
+        self.assertEqual(sink.getvalue(), string + '\n' + string)
+        self.assertEqual(encoded, ['User'])
+
+        sink = io.StringIO()
+        self.assertEqual(serialize_many([], sink), (0, 0))
+        self.assertEqual(sink.getvalue(), '')
+
+
+class TestDiff(unittest.TestCase):
+
+    def test_1(self):
+        """
+        Added, changed and removed keys are detected regardless of order and key format
+
+        """
+        a = ConnectionString.from_string('Provider=someone;User=bartolo;Timeout=5;')
+        b = {'user': 'gertrud', 'provider': 'someone', 'server': 'db7'}
+        patch = diff(a, b)
+
+        self.assertEqual(dict(patch.added), {'Server': 'db7'})
+        self.assertEqual(dict(patch.changed), {'User': 'gertrud'})
+        self.assertEqual(patch.removed, ('Timeout',))
+        self.assertTrue(patch)
+
+    def test_2(self):
+        """
+        Equal connection strings produce an empty patch, even with different order
+
+        """
+        a = ConnectionString.from_string('Provider=someone;User=bartolo;')
+        b = ConnectionString.from_string('User=bartolo;Provider=someone;')
+
+        self.assertFalse(diff(a, b))
+
+    def test_3(self):
+        """
+        Applying a patch turns the source into the target, in place
+
+        """
+        a = ConnectionString.from_string('Provider=someone;User=bartolo;Timeout=5;')
+        b = ConnectionString.from_string('User=gertrud;Provider=someone;Server=db7;')
+        same = a
+
+        a.apply(diff(a, b))
+        self.assertIs(a, same)
+        self.assertEqual(dict(a), dict(b))
+        self.assertEqual(a.get_string(), 'Provider=someone;User=gertrud;Server=db7;')
+
+        # Applying it again changes nothing
+        a.apply(diff(ConnectionString.from_string('Provider=someone;User=bartolo;Timeout=5;'), b))
+        self.assertEqual(dict(a), dict(b))
+
+        with self.assertRaises(TypeError):
+            FrozenConnectionString(a).apply(diff(a, {}))
+
+    def test_4(self):
+        """
+        Collections are compared by name, and only changed entries get a patch
+
+        """
+        unchanged = ConnectionString.from_string('User=bartolo;')
+        a = {
+            'same': unchanged,
+            'reordered': ConnectionString.from_string('User=bartolo;Server=db7;'),
+            'changed': ConnectionString.from_string('User=bartolo;'),
+            'removed': ConnectionString.from_string('User=bartolo;'),
+        }
+        b = {
+            'same': unchanged,
+            'reordered': ConnectionString.from_string('Server=db7;User=bartolo;'),
+            'changed': ConnectionString.from_string('User=gertrud;'),
+            'added': ConnectionString.from_string('User=manuel;'),
+        }
+        result = diff_many(a, b)
+
+        self.assertEqual(result.added, {'added': b['added']})
+        self.assertEqual(list(result.changed), ['changed'])
+        self.assertEqual(dict(result.changed['changed'].changed), {'User': 'gertrud'})
+        self.assertEqual(result.removed, ('removed',))
+
+    def test_5(self):
+        """
+        Connection strings with different key formatters are compared with the formatter of the source
+
+        """
+        class UpperConnectionString(ConnectionString):
+            _format_key = staticmethod(lambda k: k.upper())
+
+        a = ConnectionString.from_string('Provider=someone;User=bartolo;')
+        b = UpperConnectionString.from_string('provider=someone;user=gertrud;timeout=5;')
+        patch = diff(a, b)
+
+        self.assertEqual(dict(patch.added), {'Timeout': '5'})
+        self.assertEqual(dict(patch.changed), {'User': 'gertrud'})
+        self.assertEqual(patch.removed, ())
+
+        patch = diff(b, a)
+        self.assertEqual(dict(patch.changed), {'USER': 'bartolo'})
+        self.assertEqual(patch.removed, ('TIMEOUT',))
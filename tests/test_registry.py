@@ -0,0 +1,137 @@
+# coding: utf-8
+
+"""
+Unittests for the connection string registry
+"""
+
+from __future__ import unicode_literals
+
+import gc
+import threading
+import time
+import unittest
+
+from pyconstring import ConnectionString, ConnectionStringRegistry, FrozenConnectionString
+
+
+class TestConnectionStringRegistry(unittest.TestCase):
+
+    def test_1(self):
+        """
+        Registered connection strings are read-only and can be looked up
+
+        """
+        registry = ConnectionStringRegistry()
+        registry.set('from text', 'User=bartolo;')
+        registry.set('from object', ConnectionString({'User': 'gertrud'}))
+
+        self.assertEqual(registry['from text']['user'], 'bartolo')
+        self.assertEqual(registry.get('from object')['user'], 'gertrud')
+        self.assertIsNone(registry.get('missing'))
+        self.assertEqual(sorted(registry), ['from object', 'from text'])
+
+        for name in registry:
+            self.assertIsInstance(registry[name], FrozenConnectionString)
+
+        with self.assertRaises(KeyError):
+            registry['missing']
+
+    def test_2(self):
+        """
+        get_or_parse only parses missing names
+
+        """
+        registry = ConnectionStringRegistry()
+        obj = registry.get_or_parse('db', 'User=bartolo;')
+
+        self.assertIs(registry.get_or_parse('db', 'User=gertrud;'), obj)
+        self.assertEqual(registry.stats(), (1, 1, 1, 0))
+
+    def test_3(self):
+        """
+        Discarding removes the name, and tolerates missing ones
+
+        """
+        registry = ConnectionStringRegistry()
+        registry.set('db', 'User=bartolo;')
+        registry.discard('db')
+        registry.discard('db')
+
+        self.assertNotIn('db', registry)
+        self.assertEqual(len(registry), 0)
+
+    def test_4(self):
+        """
+        Invalid strings are not registered
+
+        """
+        registry = ConnectionStringRegistry()
+
+        with self.assertRaises(ValueError):
+            registry.get_or_parse('db', 'User==bartolo;')
+
+        self.assertNotIn('db', registry)
+
+    def test_5(self):
+        """
+        When many threads ask for the same missing name, it is parsed only once
+
+        """
+        parsed = []
+
+        class SlowConnectionString(FrozenConnectionString):
+
+            @classmethod
+            def from_string(cls, string):
+                parsed.append(string)
+                time.sleep(0.05)
+                return super(SlowConnectionString, cls).from_string(string)
+
+        registry = ConnectionStringRegistry(stripes=4, cs_class=SlowConnectionString)
+        start = threading.Event()
+        results = []
+
+        def worker():
+            start.wait()
+            results.append(registry.get_or_parse('db', 'User=bartolo;'))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(parsed), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(obj is results[0] for obj in results))
+
+        stats = registry.stats()
+        self.assertEqual(stats.parses, 1)
+        self.assertEqual(stats.hits + stats.misses, 8)
+        self.assertGreater(stats.contentions, 0)
+
+    def test_6(self):
+        """
+        Counters of finished threads are kept in the statistics, but not one by one
+
+        """
+        registry = ConnectionStringRegistry()
+        registry.set('db', 'User=bartolo;')
+
+        def worker():
+            registry.get('db')
+            registry.get('missing')
+
+        for _ in range(50):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+
+        gc.collect()
+
+        stats = registry.stats()
+        self.assertEqual((stats.hits, stats.misses), (50, 50))
+        # Only the counters of living threads are tracked individually
+        self.assertLessEqual(len(registry._thread_counters), 1)